@@ -13,6 +13,14 @@ class AssetKind(Enum):
     USDC = 4
     DED = 5
 
+# decimals of non-native assets; the network token's decimals come from NetworkInfo
+ASSET_DECIMALS = {
+    AssetKind.USDT: 6,
+    AssetKind.USDC: 6,
+    AssetKind.DED: 10,
+}
+_ASSET_DENOMINATION_FACTORS = {asset_kind: 10**digits for asset_kind, digits in ASSET_DECIMALS.items()}
+
 class PriceService:
   def __init__(self, network_info):
     self._logger = logging.getLogger(__name__)
@@ -67,14 +75,9 @@ class PriceService:
   # returns the human-readable value with the denomination applied
   def apply_denomination(self, value, asset_kind: AssetKind = None) -> float:
       if asset_kind is None:
-        digits = self.network_info.digits
         denomination_factor = self.network_info.denomination_factor
-      elif asset_kind == AssetKind.USDT or asset_kind == AssetKind.USDC:
-        digits = 6
-        denomination_factor = 10**digits
-      elif asset_kind == AssetKind.DED:
-        digits = 10
-        denomination_factor = 10**digits
+      elif asset_kind in _ASSET_DENOMINATION_FACTORS:
+        denomination_factor = _ASSET_DENOMINATION_FACTORS[asset_kind]
       else:
           raise Exception(f"pls implement me. asset_kind {asset_kind}, type {type(asset_kind)}")
 
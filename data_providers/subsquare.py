@@ -1,16 +1,87 @@
 from .data_provider import DataProvider
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor
 from .price_service import AssetKind
 
+# call indices are static, so we build these sets once at import instead of on every (recursive) proposal evaluation
+
+# for batch referenda, we need to fetch the individual referenda to inspect the proposal
+NEEDS_DETAIL_CALL_INDICES = frozenset([
+    "0x1a00", # utility.batch
+    "0x1a02", # utility.batchAll
+    "0x1a04", # utility.forceBatch
+    "0x1305", # treasury.spend
+    "0x6300", # xcmPallet.send
+])
+
+# we use this map to emit warnings of proposals we haven't seen on OpenGov before. Those that are known to be zero-value (because they are not Treasury-related) are excluded
+KNOWN_ZERO_VALUE_CALL_INDICES = frozenset([
+    "0x0000", # system.remark
+    "0x0007", # system.remarkWithEvent
+    "0x0002", # system.setCode
+    "0x0509", # balances.forceAdjustTotalIssuance
+    "0x0a00", # preimage.notePreimage <- lol 828
+    "0x0a02", # preimage.requestPreimage <- eh 74
+    "0x1300", # treasury.proposeSpend <- omg 1108
+    "0x1302", # treasury.approveProposal <- wtf 351
+    "0x1503", # referenda.cancel
+    "0x1504", # referenda.kill
+    "0x1703", # whitelist.dispatchWhitelistedCallWithPreimage
+    "0x1c00", # identity.addRegistrar
+    "0x2200", # bounties.proposeBounty
+    "0x2201", # bounties.approveBounty
+    "0x2202", # bounties.proposeCurator
+    "0x2203", # bounties.unassignCurator
+    "0x2204", # bounties.acceptCurator
+    "0x2207", # bounties.closeBounty
+    "0x270b", # nominationPools.setConfigs
+    "0x3303", # configuration.setMaxCodeSize
+    "0x3800", # paras.forceSetCurrentCode
+    "0x3c07", # hrmp.forceOpenHrmpChannel
+    "0x4603", # registrar.swap
+    "0x4602", # registrar.deregister
+    "0x4700", # slots.forceLease
+    "0x4701", # slots.clearAllLeases
+    "0x4800", # auctions.newAuction
+    "0x6300", # xcmPallet.send
+    "0x6500", # assetRate.create
+    "0x6501", # assetRate.update
+    "0x6502", # assetRate.remove
+])
+
+BATCH_CALL_INDICES = frozenset([
+    "0x1a00", # utility.batch 
+    "0x1a02", # utility.batchAll
+    "0x1a04", # utility.forceBatch
+    "0x0104", # scheduler.scheduleAfter
+])
+
+SHOULD_INSPECT_CALL_INDICES = frozenset([
+    "0x0102", # scheduler.scheduleNamed
+    "0x0103", # scheduler.cancelNamed
+    "0x0502", # balances.forceTransfer
+    "0x0508", # balances.forceSetBalance
+    "0x6300", # xcmPallet.send
+
+])
+
 class SubsquareProvider(DataProvider):
 
     def __init__(self, network_info, price_service):
         self.network_info = network_info
         self.price_service = price_service
         self._logger = logging.getLogger(__name__)
+        # reuse keep-alive connections across the many list and detail requests
+        self._session = requests.Session()
+        # retry transient failures; once retries are exhausted the last response is returned and handled by the callers
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        self._session.mount("https://", HTTPAdapter(max_retries=retries))
+        self._request_timeout = (5, 30)  # (connect, read) in seconds
 
     def fetch_referenda(self, referenda_to_update=10):
 
@@ -22,21 +93,17 @@ class SubsquareProvider(DataProvider):
 
         # load details
 
-        # for batch referenda, we need to fetch the individual referenda to inspect the proposal
-        needs_detail_call_indices = [
-            "0x1a00", # utility.batch
-            "0x1a02", # utility.batchAll
-            "0x1a04", # utility.forceBatch
-            "0x1305", # treasury.spend
-            "0x6300", # xcmPallet.send
-        ]
-        replacements = []
-        for index, row in df_updates.iterrows():
+        detail_urls = []
+        for referendum_index, onchain_data in zip(df_updates["referendumIndex"], df_updates["onchainData"]):
             # if we have a preimage and it is within the set of batch call indexes, we need to fetch the individual referenda
-            if len(row["onchainData"]["proposal"]) > 0 and row["onchainData"]["proposal"]["callIndex"] in needs_detail_call_indices:
-                url = f"{base_url}/{row['referendumIndex']}.json"
-                referendum = self._fetchItem(url)
-                replacements.append(referendum)
+            proposal = onchain_data["proposal"]
+            if len(proposal) > 0 and proposal["callIndex"] in NEEDS_DETAIL_CALL_INDICES:
+                detail_urls.append(f"{base_url}/{referendum_index}.json")
+
+        # the detail calls are independent, so we fetch them concurrently. Keep the worker count below the session's connection pool size (10)
+        self._logger.debug(f"Fetching {len(detail_urls)} referendum details")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            replacements = list(executor.map(self._fetchItem, detail_urls))
         df_replacements = pd.DataFrame(replacements)
         df_updates = pd.concat([df_updates, df_replacements], ignore_index=True)
         df_updates.drop_duplicates(subset=["referendumIndex"], keep="last", inplace=True)
@@ -93,57 +160,6 @@ class SubsquareProvider(DataProvider):
             return pd.to_datetime(state["indexer"]["blockTime"]*1e6)
         # return the value of the proposal denominated in the network's token
         def _get_proposal_value(proposal, timestamp, ref_id) -> float:
-            # we use this map to emit warnings of proposals we haven't seen on OpenGov before. Those that are known to be zero-value (because they are not Treasury-related) are excluded
-            known_zero_value_proposals = [
-                "0x0000", # system.remark
-                "0x0007", # system.remarkWithEvent
-                "0x0002", # system.setCode
-                "0x0509", # balances.forceAdjustTotalIssuance
-                "0x0a00", # preimage.notePreimage <- lol 828
-                "0x0a02", # preimage.requestPreimage <- eh 74
-                "0x1300", # treasury.proposeSpend <- omg 1108
-                "0x1302", # treasury.approveProposal <- wtf 351
-                "0x1503", # referenda.cancel
-                "0x1504", # referenda.kill
-                "0x1703", # whitelist.dispatchWhitelistedCallWithPreimage
-                "0x1c00", # identity.addRegistrar
-                "0x2200", # bounties.proposeBounty
-                "0x2201", # bounties.approveBounty
-                "0x2202", # bounties.proposeCurator
-                "0x2203", # bounties.unassignCurator
-                "0x2204", # bounties.acceptCurator
-                "0x2207", # bounties.closeBounty
-                "0x270b", # nominationPools.setConfigs
-                "0x3303", # configuration.setMaxCodeSize
-                "0x3800", # paras.forceSetCurrentCode
-                "0x3c07", # hrmp.forceOpenHrmpChannel
-                "0x4603", # registrar.swap
-                "0x4602", # registrar.deregister
-                "0x4700", # slots.forceLease
-                "0x4701", # slots.clearAllLeases
-                "0x4800", # auctions.newAuction
-                "0x6300", # xcmPallet.send
-                "0x6500", # assetRate.create
-                "0x6501", # assetRate.update
-                "0x6502", # assetRate.remove
-            ]
-
-            batch_proposals = [
-                "0x1a00", # utility.batch 
-                "0x1a02", # utility.batchAll
-                "0x1a04", # utility.forceBatch
-                "0x0104", # scheduler.scheduleAfter
-            ]
-
-            should_inspect_proposal = [
-                "0x0102", # scheduler.scheduleNamed
-                "0x0103", # scheduler.cancelNamed
-                "0x0502", # balances.forceTransfer
-                "0x0508", # balances.forceSetBalance
-                "0x6300", # xcmPallet.send
-
-            ]
-
             # get call index
             call_index = None
             if len(proposal) > 0:
@@ -159,9 +175,9 @@ class SubsquareProvider(DataProvider):
             else: # no preimage
                 return 0
 
-            if call_index in known_zero_value_proposals:
+            if call_index in KNOWN_ZERO_VALUE_CALL_INDICES:
                 return 0
-            elif call_index in batch_proposals:
+            elif call_index in BATCH_CALL_INDICES:
                 value = 0
                 if call_index == "0x0104": # scheduler.scheduleAfter
                     call = proposal["args"][3]["value"]
@@ -171,7 +187,7 @@ class SubsquareProvider(DataProvider):
                         # if you get an exception here, make sure you requested the details on this callIndex
                         value += _get_proposal_value(call, timestamp, ref_id)
                 return value
-            elif call_index in should_inspect_proposal:
+            elif call_index in SHOULD_INSPECT_CALL_INDICES:
                 raise ValueError(f"Ref {ref_id}: {proposal} not implemented")
             elif call_index == "0x1305": # treasury.spend
                 assert args is not None, "we should always have the details of the call"
@@ -206,13 +222,14 @@ class SubsquareProvider(DataProvider):
 
         # returns the network-token-denominated value of the proposal
         def _determineDOTAmount(row) -> float:
-            if "treasuryInfo" in row["onchainData"]:
-                value = row["onchainData"]["treasuryInfo"]["amount"]
+            onchain_data = row["onchainData"]
+            if "treasuryInfo" in onchain_data:
+                value = onchain_data["treasuryInfo"]["amount"]
                 result = self.price_service.apply_denomination(value)
             elif "treasuryBounties" in row: # accepting a new bounty
                 result = 0
             else:
-                result = _get_proposal_value(row["onchainData"]["proposal"], row["proposal_time"], row["id"])
+                result = _get_proposal_value(onchain_data["proposal"], row["proposal_time"], row["id"])
             
             if not isinstance(result, (int, float)):
                 raise ValueError(f"Expected a number, got {result} of type {type(result)}")
@@ -247,14 +264,14 @@ class SubsquareProvider(DataProvider):
         }, inplace=True)
 
         df["proposal_time"] = pd.to_datetime(df["proposal_time"], utc=True)
-        df["latest_status_change"] = pd.to_datetime(df["state"].apply(lambda x: x["indexer"]["blockTime"]*1e6), utc=True)
+        df["latest_status_change"] = pd.to_datetime(df["state"].map(lambda x: x["indexer"]["blockTime"]), unit="ms", utc=True)
 
         df["status"] = df["state"].apply(_get_status)
         df[self.network_info.ticker] = pd.to_numeric(df.apply(lambda x:_determineDOTAmount(x), axis=1))
         df["USD_proposal_time"] = df.apply(self._determine_usd_price_factory("proposal_time"), axis=1)
         df["USD_latest"] = df.apply(self._determine_usd_price_factory("latest_status_change"), axis=1)        
-        df["tally.ayes"] = df.apply(lambda x: self.price_service.apply_denomination(x["onchainData"]["tally"]["ayes"]), axis=1)
-        df["tally.nays"] = df.apply(lambda x: self.price_service.apply_denomination(x["onchainData"]["tally"]["nays"]), axis=1)
+        df["tally.ayes"] = df["onchainData"].map(lambda x: self.price_service.apply_denomination(x["tally"]["ayes"]))
+        df["tally.nays"] = df["onchainData"].map(lambda x: self.price_service.apply_denomination(x["tally"]["nays"]))
         df["track"] = df["onchainData"].apply(_determineTrack)
 
         df.set_index("id", inplace=True)
@@ -288,8 +305,8 @@ class SubsquareProvider(DataProvider):
         df["DOT"] = df["value"] / self.network_info.denomination_factor
         # drop the columns ["blockHash"]
         #df.drop(columns=["blockHash"], inplace=True)
-        df["proposal_time"] = pd.to_datetime(df["indexer"].apply(lambda x: x["blockTime"])*1e6)
-        df["latest_status_change"] = pd.to_datetime(df["state"].apply(lambda x: x["indexer"]["blockTime"])*1e6)
+        df["proposal_time"] = pd.to_datetime(df["indexer"].map(lambda x: x["blockTime"]), unit="ms")
+        df["latest_status_change"] = pd.to_datetime(df["state"].map(lambda x: x["indexer"]["blockTime"]), unit="ms")
         df["USD_proposal_time"] = df.apply(self._determine_usd_price_factory("proposal_time"), axis=1)
         df["USD_latest"] = df.apply(self._determine_usd_price_factory("latest_status_change"), axis=1)        
 
@@ -307,7 +324,7 @@ class SubsquareProvider(DataProvider):
         while True:
             url = f"{base_url}?page={page}&page_size=100"
             self._logger.debug(f"Fetching from {url}")
-            response = requests.get(url)
+            response = self._session.get(url, timeout=self._request_timeout)
             if response.status_code == 200:
                 data = response.json()
                 items = data['items']
@@ -329,7 +346,7 @@ class SubsquareProvider(DataProvider):
         return df
     
     def _fetchItem(self, url):
-        response = requests.get(url)
+        response = self._session.get(url, timeout=self._request_timeout)
         if response.status_code == 200:
             data = response.json()
             return data
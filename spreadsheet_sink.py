@@ -16,6 +16,7 @@ class SpreadsheetSink:
         creds = Credentials.from_service_account_info(self.credentials, scopes=scope)
         self._gc = gspread.authorize(creds)
         self._logger = logging.getLogger(__name__)
+        self._spreadsheets = {}  # spreadsheet_id -> opened spreadsheet, reused across update_worksheet calls
         
 
     """# Update Spreadsheet
@@ -36,11 +37,14 @@ class SpreadsheetSink:
 
         assert self._gc is not None, "You need to connect to gspread first"
 
-        # copy the df to avoid modifying the original
-        df = df.copy()
+        # shallow copy: we only replace whole columns and the index below, so the caller's data stays untouched
+        df = df.copy(deep=False)
 
         # The credentialed user email needs to have access to the Google Sheet
-        spreadsheet = self._gc.open_by_key(spreadsheet_id)
+        spreadsheet = self._spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            spreadsheet = self._gc.open_by_key(spreadsheet_id)
+            self._spreadsheets[spreadsheet_id] = spreadsheet
         # load the data
         worksheet = spreadsheet.worksheet(name)
         column_count = len(df.columns)
@@ -80,25 +84,28 @@ class SpreadsheetSink:
 
         # transformations to be compatible with the Google Sheets API
         if "proposal_time" in df.columns:
-            df["proposal_time"] = df["proposal_time"].apply(self._format_date)
+            df["proposal_time"] = self._format_dates(df["proposal_time"])
         if "latest_status_change" in df.columns:
-            df["latest_status_change"] = df["latest_status_change"].apply(self._format_date)
+            df["latest_status_change"] = self._format_dates(df["latest_status_change"])
 
         # build deltas
         df.index = df.index.astype(str)  # coerce numerical indexes into strings to allow comparison
-        update_df = df[df.index.isin(sheet_df.index)]
-        append_df = df[~df.index.isin(sheet_df.index)]
+        in_sheet = df.index.isin(sheet_df.index)
+        update_df = df[in_sheet]
+        append_df = df[~in_sheet]
 
         # make sure columns can be converted to json
         columns_to_convert = ["DOT", "USD_proposal_time", "tally.ayes", "tally.nays", "tally.turnout", "tally.total", "proposal_time", "latest_status_change", "USD_latest"]
-        for column in columns_to_convert:
-            if column in sheet_df.columns:
-                sheet_df[column] = sheet_df[column].astype("object").fillna("")
+        columns_to_convert = [column for column in columns_to_convert if column in sheet_df.columns]
+        if columns_to_convert:
+            sheet_df[columns_to_convert] = sheet_df[columns_to_convert].astype("object").fillna("")
 
         # Update the cells with new values
-        sheet_df.update(update_df)
-        data_to_update = sheet_df.values.tolist()
-        worksheet.update(data_to_update, range, raw=False)
+        # on a first-time load the sheet is empty and everything is appended below, so skip the no-op update call
+        if not sheet_df.empty:
+            sheet_df.update(update_df)
+            data_to_update = sheet_df.values.tolist()
+            worksheet.update(data_to_update, range, raw=False)
 
         # Append new rows at the bottom
         if not append_df.empty:
@@ -144,6 +151,16 @@ class SpreadsheetSink:
 
         spreadsheet.client.session.close()
 
+    def _format_dates(self, series):
+        # fast path: datetime columns are converted in one vectorized pass instead of per element
+        if not pd.api.types.is_datetime64_any_dtype(series):
+            return series.apply(self._format_date)
+        if series.isnull().any():
+            raise Exception("implement a warning or contract around this method")
+        if series.dt.tz is not None:
+            series = series.dt.tz_localize(None)  # keep the wall-clock date, same as timestamp.date()
+        return (series.dt.normalize() - pd.Timestamp(1900, 1, 1)).dt.days  # days since 1900-01-01
+
     def _format_date(self, timestamp):
         if pd.isnull(timestamp):
             raise Exception("implement a warning or contract around this method")